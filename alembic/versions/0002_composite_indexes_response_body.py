@@ -0,0 +1,55 @@
+"""composite indexes and raw idempotency response body
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-15 22:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, Sequence[str], None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('invoices', schema=None) as batch_op:
+        batch_op.create_index('ix_invoices_tenant_status_created', ['tenant_id', 'status', 'created_at'], unique=False)
+        batch_op.create_index('ix_invoices_tenant_amount', ['tenant_id', 'amount'], unique=False)
+        batch_op.create_index('ix_invoices_tenant_created_id', ['tenant_id', 'created_at', 'id'], unique=False)
+
+    with op.batch_alter_table('bank_transactions', schema=None) as batch_op:
+        batch_op.create_index('ix_tx_tenant_posted', ['tenant_id', 'posted_at'], unique=False)
+        batch_op.create_index('ix_tx_tenant_created_id', ['tenant_id', 'created_at', 'id'], unique=False)
+
+    # Stored replays were JSON text; keep them as the raw response bytes.
+    with op.batch_alter_table('idempotency_keys', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('response_body', sa.LargeBinary(), nullable=True))
+    op.execute("UPDATE idempotency_keys SET response_body = CAST(response_payload AS BLOB)")
+    with op.batch_alter_table('idempotency_keys', schema=None) as batch_op:
+        batch_op.drop_column('response_payload')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('idempotency_keys', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('response_payload', sa.JSON(), nullable=True))
+    op.execute("UPDATE idempotency_keys SET response_payload = CAST(response_body AS TEXT)")
+    with op.batch_alter_table('idempotency_keys', schema=None) as batch_op:
+        batch_op.drop_column('response_body')
+
+    with op.batch_alter_table('bank_transactions', schema=None) as batch_op:
+        batch_op.drop_index('ix_tx_tenant_created_id')
+        batch_op.drop_index('ix_tx_tenant_posted')
+
+    with op.batch_alter_table('invoices', schema=None) as batch_op:
+        batch_op.drop_index('ix_invoices_tenant_created_id')
+        batch_op.drop_index('ix_invoices_tenant_amount')
+        batch_op.drop_index('ix_invoices_tenant_status_created')
@@ -1,27 +1,52 @@
 from typing import List, Optional
 from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, Header, Query
+import msgspec
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Header, Query, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, lambda_stmt
 from app.core.database import get_db
+from app.core.tenant_cache import tenant_exists, remember_tenant
+from app.core.pagination import cursor_column, decode_cursor, keyset_after, keyset_order
 from app import models, schemas
-from app.services.reconciliation import ReconciliationService
+from app.services.reconciliation import ReconciliationService, bump_tenant_revision
 from app.services.import_service import ImportService
 from app.services.ai_service import AIService
 
 router = APIRouter()
 
+INVOICE_COLUMNS = (
+    models.Invoice.id,
+    models.Invoice.tenant_id,
+    models.Invoice.vendor_id,
+    models.Invoice.invoice_number,
+    models.Invoice.amount,
+    models.Invoice.currency,
+    models.Invoice.invoice_date,
+    models.Invoice.description,
+    models.Invoice.status,
+    models.Invoice.created_at,
+)
+INVOICE_PAGE_COLUMNS = INVOICE_COLUMNS + (cursor_column(models.Invoice),)
+
+# The import body is decoded and validated by msgspec rather than Pydantic, so
+# its OpenAPI schema is generated from the Struct and attached by hand.
+TRANSACTIONS_DECODER = msgspec.json.Decoder(List[schemas.TransactionCreate])
+_, _transaction_schemas = msgspec.json.schema_components([schemas.TransactionCreate])
+TRANSACTIONS_BODY_SCHEMA = {"type": "array", "items": _transaction_schemas["TransactionCreate"]}
+
 @router.post("/tenants", response_model=schemas.TenantResponse)
 async def create_tenant(tenant: schemas.TenantCreate, db: AsyncSession = Depends(get_db)):
     new_tenant = models.Tenant(name=tenant.name)
     db.add(new_tenant)
     await db.commit()
     await db.refresh(new_tenant)
+    remember_tenant(new_tenant.id)
     return new_tenant
 
 @router.get("/tenants", response_model=List[schemas.TenantResponse])
 async def list_tenants(db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(models.Tenant))
+    result = await db.execute(lambda_stmt(lambda: select(models.Tenant)))
     return result.scalars().all()
 
 @router.post("/tenants/{tenant_id}/invoices", response_model=schemas.InvoiceResponse)
@@ -30,19 +55,19 @@ async def create_invoice(
     invoice: schemas.InvoiceCreate, 
     db: AsyncSession = Depends(get_db)
 ):
-    tenant = await db.get(models.Tenant, tenant_id)
-    if not tenant:
+    if not await tenant_exists(db, tenant_id):
         raise HTTPException(status_code=404, detail="Tenant not found")
     new_invoice = models.Invoice(
         tenant_id=tenant_id,
         **invoice.model_dump()
     )
     db.add(new_invoice)
+    await bump_tenant_revision(db, tenant_id)
     await db.commit()
     await db.refresh(new_invoice)
     return new_invoice
 
-@router.get("/tenants/{tenant_id}/invoices", response_model=List[schemas.InvoiceResponse])
+@router.get("/tenants/{tenant_id}/invoices", response_model=schemas.InvoicePage)
 async def list_invoices(
     tenant_id: str,
     status: Optional[str] = Query(None),
@@ -51,34 +76,62 @@ async def list_invoices(
     date_to: Optional[datetime] = Query(None),
     amount_min: Optional[float] = Query(None),
     amount_max: Optional[float] = Query(None),
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = Query(None),
     db: AsyncSession = Depends(get_db)
 ):
-    query = select(models.Invoice).where(models.Invoice.tenant_id == tenant_id)
+    query = lambda_stmt(lambda: select(*INVOICE_PAGE_COLUMNS).where(models.Invoice.tenant_id == tenant_id))
     if status:
-        query = query.where(models.Invoice.status == status)
+        query += lambda s: s.where(models.Invoice.status == status)
     if vendor_id:
-        query = query.where(models.Invoice.vendor_id == vendor_id)
+        query += lambda s: s.where(models.Invoice.vendor_id == vendor_id)
     if date_from:
-        query = query.where(models.Invoice.invoice_date >= date_from)
+        query += lambda s: s.where(models.Invoice.invoice_date >= date_from)
     if date_to:
-        query = query.where(models.Invoice.invoice_date <= date_to)
+        query += lambda s: s.where(models.Invoice.invoice_date <= date_to)
     if amount_min is not None:
-        query = query.where(models.Invoice.amount >= amount_min)
+        query += lambda s: s.where(models.Invoice.amount >= amount_min)
     if amount_max is not None:
-        query = query.where(models.Invoice.amount <= amount_max)
+        query += lambda s: s.where(models.Invoice.amount <= amount_max)
+    if cursor:
+        try:
+            cursor_created_at, cursor_id = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query += lambda s: s.where(keyset_after(models.Invoice, cursor_id, cursor_created_at))
+    fetch = limit + 1
+    query += lambda s: s.order_by(*keyset_order(models.Invoice)).limit(fetch)
     result = await db.execute(query)
-    return result.scalars().all()
+    invoices = [dict(row) for row in result.mappings()]
+    next_cursor = invoices[limit - 1]["cursor"] if len(invoices) > limit else None
+    for invoice in invoices:
+        del invoice["cursor"]
+    # Rows are plain column values already shaped like InvoiceResponse, so skip
+    # re-validating them through Pydantic and encode straight to JSON bytes.
+    return Response(
+        content=orjson.dumps({"items": invoices[:limit], "next_cursor": next_cursor}),
+        media_type="application/json"
+    )
 
-@router.post("/tenants/{tenant_id}/bank-transactions/import", response_model=schemas.ImportResponse)
+@router.post(
+    "/tenants/{tenant_id}/bank-transactions/import",
+    response_model=schemas.ImportResponse,
+    openapi_extra={"requestBody": {"required": True, "content": {"application/json": {"schema": TRANSACTIONS_BODY_SCHEMA}}}}
+)
 async def import_transactions(
     tenant_id: str,
-    transactions: List[schemas.TransactionCreate],
+    request: Request,
     idempotency_key: str = Header(..., alias="Idempotency-Key"),
     db: AsyncSession = Depends(get_db)
 ):
+    try:
+        transactions = TRANSACTIONS_DECODER.decode(await request.body())
+    except msgspec.DecodeError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     service = ImportService(db)
-    tx_data = [tx.model_dump() for tx in transactions]
-    return await service.import_transactions(tenant_id, tx_data, idempotency_key)
+    tx_data = msgspec.to_builtins(transactions)
+    body = await service.import_transactions_json(tenant_id, tx_data, idempotency_key)
+    return Response(content=body, media_type="application/json")
 
 @router.post("/tenants/{tenant_id}/reconcile", response_model=List[schemas.MatchCandidateResponse])
 async def reconcile_invoices(
@@ -98,6 +151,7 @@ async def delete_invoice(
     if not invoice or invoice.tenant_id != tenant_id:
         raise HTTPException(status_code=404, detail="Invoice not found")
     await db.delete(invoice)
+    await bump_tenant_revision(db, tenant_id)
     await db.commit()
     return {"message": "Invoice deleted"}
 
@@ -122,10 +176,15 @@ async def explain_match(
     transaction_id: str,
     db: AsyncSession = Depends(get_db)
 ):
-    invoice = await db.get(models.Invoice, invoice_id)
-    transaction = await db.get(models.BankTransaction, transaction_id)
-    if not invoice or not transaction:
+    result = await db.execute(
+        select(models.Invoice, models.BankTransaction)
+        .join(models.BankTransaction, models.BankTransaction.id == transaction_id)
+        .where(models.Invoice.id == invoice_id)
+    )
+    row = result.one_or_none()
+    if row is None:
         raise HTTPException(status_code=404, detail="Invoice or Transaction not found")
+    invoice, transaction = row
     if invoice.tenant_id != tenant_id or transaction.tenant_id != tenant_id:
          raise HTTPException(status_code=403, detail="Resource mismatch for tenant")
     service = AIService()
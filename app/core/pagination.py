@@ -0,0 +1,27 @@
+from typing import Any, Tuple
+from sqlalchemy import String, cast, func, and_, or_, type_coerce
+from sqlalchemy.sql.elements import ColumnElement, Label
+
+def cursor_column(model: Any) -> Label:
+    # The cursor carries created_at exactly as stored plus the id, hex-encoded by
+    # SQLite, so the next page doesn't depend on the anchor row still existing.
+    return func.hex(cast(model.created_at, String) + "|" + model.id).label("cursor")
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    try:
+        created_at, row_id = bytes.fromhex(cursor).decode().split("|", 1)
+    except ValueError as e:
+        raise ValueError("Invalid cursor") from e
+    return created_at, row_id
+
+def keyset_order(model: Any) -> Tuple[ColumnElement, ColumnElement]:
+    return model.created_at.desc(), model.id.desc()
+
+def keyset_after(model: Any, cursor_id: str, created_at: str) -> ColumnElement:
+    # Compare as text against the stored value; no CAST, so the
+    # (tenant_id, created_at, id) index still applies.
+    stored = type_coerce(model.created_at, String)
+    return or_(
+        stored < created_at,
+        and_(stored == created_at, model.id < cursor_id)
+    )
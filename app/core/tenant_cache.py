@@ -0,0 +1,20 @@
+from cachetools import TTLCache
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import models
+
+# Only hits are cached: tenants are never deleted, so a positive answer can't go
+# stale, while a miss must be re-checked in case the tenant was created since.
+_known_tenants: TTLCache = TTLCache(maxsize=10_000, ttl=300)
+
+def remember_tenant(tenant_id: str) -> None:
+    _known_tenants[tenant_id] = True
+
+async def tenant_exists(db: AsyncSession, tenant_id: str) -> bool:
+    if tenant_id in _known_tenants:
+        return True
+    result = await db.execute(select(1).where(models.Tenant.id == tenant_id))
+    if result.first() is None:
+        return False
+    remember_tenant(tenant_id)
+    return True
@@ -0,0 +1,30 @@
+import asyncio
+from typing import Any, Dict, List, Optional, Type
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from strawberry.dataloader import DataLoader
+from app import models
+from app.core.database import Base
+
+async def _batch_load(
+    model: Type[Base],
+    ids: List[str],
+    db: AsyncSession,
+    lock: asyncio.Lock
+) -> List[Optional[Any]]:
+    # Loaders share the request's session, which can't run two statements at once.
+    async with lock:
+        result = await db.execute(select(model).where(model.id.in_(ids)))
+    rows = {row.id: row for row in result.scalars()}
+    return [rows.get(i) for i in ids]
+
+def create_loaders(db: AsyncSession) -> Dict[str, DataLoader]:
+    lock = asyncio.Lock()
+
+    def loader(model: Type[Base]) -> DataLoader:
+        return DataLoader(load_fn=lambda ids: _batch_load(model, ids, db, lock))
+
+    return {
+        "invoice_loader": loader(models.Invoice),
+        "transaction_loader": loader(models.BankTransaction),
+    }
@@ -1,11 +1,15 @@
+import asyncio
 import strawberry
 from typing import List, Optional
 from strawberry.types import Info
-from sqlalchemy import select
+from sqlalchemy import select, lambda_stmt
 from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
 from app import models
-from app.services.reconciliation import ReconciliationService
+from app.core.tenant_cache import tenant_exists, remember_tenant
+from app.graphql.selection import columns_from_info, build, format_timestamp, iso_timestamp
+from app.core.pagination import cursor_column, decode_cursor, keyset_after, keyset_order
+from app.services.reconciliation import ReconciliationService, bump_tenant_revision
 from app.services.ai_service import AIService
 from app.services.import_service import ImportService
 
@@ -51,6 +55,7 @@ class InvoiceType:
     invoice_number: Optional[str]
     vendor_id: Optional[str]
     created_at: str
+    cursor: str
 
 @strawberry.type
 class TransactionType:
@@ -61,6 +66,7 @@ class TransactionType:
     description: str
     external_id: Optional[str]
     created_at: str
+    cursor: str
 
 @strawberry.type
 class MatchCandidateType:
@@ -77,20 +83,53 @@ class ImportResultType:
     count: int
     transaction_ids: List[str]
 
+INVOICE_COLUMNS = (
+    models.Invoice.id,
+    models.Invoice.amount,
+    models.Invoice.currency,
+    iso_timestamp(models.Invoice.invoice_date),
+    models.Invoice.status,
+    models.Invoice.description,
+    models.Invoice.invoice_number,
+    models.Invoice.vendor_id,
+    iso_timestamp(models.Invoice.created_at, utc=True),
+    cursor_column(models.Invoice),
+)
+
+TRANSACTION_COLUMNS = (
+    models.BankTransaction.id,
+    models.BankTransaction.amount,
+    models.BankTransaction.currency,
+    iso_timestamp(models.BankTransaction.posted_at),
+    models.BankTransaction.description,
+    models.BankTransaction.external_id,
+    iso_timestamp(models.BankTransaction.created_at, utc=True),
+    cursor_column(models.BankTransaction),
+)
+
+MATCH_CANDIDATE_COLUMNS = (
+    models.MatchCandidate.id,
+    models.MatchCandidate.invoice_id,
+    models.MatchCandidate.transaction_id,
+    models.MatchCandidate.score,
+    models.MatchCandidate.status,
+    iso_timestamp(models.MatchCandidate.created_at, utc=True),
+)
+
+TENANT_COLUMNS = (
+    models.Tenant.id,
+    models.Tenant.name,
+    iso_timestamp(models.Tenant.created_at, utc=True),
+)
+
 @strawberry.type
 class Query:
     @strawberry.field
     async def tenants(self, info: Info) -> List[TenantType]:
         db: AsyncSession = info.context["db"]
-        result = await db.execute(select(models.Tenant))
-        tenants = result.scalars().all()
-        return [
-            TenantType(
-                id=t.id, 
-                name=t.name, 
-                created_at=t.created_at.isoformat()
-            ) for t in tenants
-        ]
+        columns = columns_from_info(info, TENANT_COLUMNS)
+        result = await db.execute(lambda_stmt(lambda: select(*columns), track_on=[columns]))
+        return [build(TenantType, row) for row in result]
 
     @strawberry.field
     async def invoices(
@@ -101,32 +140,29 @@ class Query:
         amount_min: Optional[float] = None,
         amount_max: Optional[float] = None,
         limit: int = 50,
-        offset: int = 0
+        after: Optional[str] = None
     ) -> List[InvoiceType]:
         db: AsyncSession = info.context["db"]
-        query = select(models.Invoice).where(models.Invoice.tenant_id == tenant_id)
+        columns = columns_from_info(info, INVOICE_COLUMNS)
+        query = lambda_stmt(
+            lambda: select(*columns).where(models.Invoice.tenant_id == tenant_id),
+            track_on=[columns]
+        )
         if status:
-            query = query.where(models.Invoice.status == status)
+            query += lambda s: s.where(models.Invoice.status == status)
         if amount_min is not None:
-            query = query.where(models.Invoice.amount >= amount_min)
+            query += lambda s: s.where(models.Invoice.amount >= amount_min)
         if amount_max is not None:
-            query = query.where(models.Invoice.amount <= amount_max)
-        query = query.offset(offset).limit(limit)
+            query += lambda s: s.where(models.Invoice.amount <= amount_max)
+        if after:
+            try:
+                cursor_created_at, cursor_id = decode_cursor(after)
+            except ValueError:
+                raise Exception("Invalid cursor")
+            query += lambda s: s.where(keyset_after(models.Invoice, cursor_id, cursor_created_at))
+        query += lambda s: s.order_by(*keyset_order(models.Invoice)).limit(limit)
         result = await db.execute(query)
-        invoices = result.scalars().all()
-        return [
-            InvoiceType(
-                id=i.id,
-                amount=i.amount,
-                currency=i.currency,
-                invoice_date=i.invoice_date.isoformat() if i.invoice_date else None,
-                status=i.status,
-                description=i.description,
-                invoice_number=i.invoice_number,
-                vendor_id=i.vendor_id,
-                created_at=i.created_at.isoformat()
-            ) for i in invoices
-        ]
+        return [build(InvoiceType, row) for row in result]
 
     @strawberry.field
     async def bank_transactions(
@@ -136,28 +172,27 @@ class Query:
         amount_min: Optional[float] = None,
         amount_max: Optional[float] = None,
         limit: int = 50,
-        offset: int = 0
+        after: Optional[str] = None
     ) -> List[TransactionType]:
         db: AsyncSession = info.context["db"]
-        query = select(models.BankTransaction).where(models.BankTransaction.tenant_id == tenant_id)
+        columns = columns_from_info(info, TRANSACTION_COLUMNS)
+        query = lambda_stmt(
+            lambda: select(*columns).where(models.BankTransaction.tenant_id == tenant_id),
+            track_on=[columns]
+        )
         if amount_min is not None:
-            query = query.where(models.BankTransaction.amount >= amount_min)
+            query += lambda s: s.where(models.BankTransaction.amount >= amount_min)
         if amount_max is not None:
-            query = query.where(models.BankTransaction.amount <= amount_max)
-        query = query.offset(offset).limit(limit)
+            query += lambda s: s.where(models.BankTransaction.amount <= amount_max)
+        if after:
+            try:
+                cursor_created_at, cursor_id = decode_cursor(after)
+            except ValueError:
+                raise Exception("Invalid cursor")
+            query += lambda s: s.where(keyset_after(models.BankTransaction, cursor_id, cursor_created_at))
+        query += lambda s: s.order_by(*keyset_order(models.BankTransaction)).limit(limit)
         result = await db.execute(query)
-        transactions = result.scalars().all()
-        return [
-            TransactionType(
-                id=t.id,
-                amount=t.amount,
-                currency=t.currency,
-                posted_at=t.posted_at.isoformat(),
-                description=t.description,
-                external_id=t.external_id,
-                created_at=t.created_at.isoformat()
-            ) for t in transactions
-        ]
+        return [build(TransactionType, row) for row in result]
 
     @strawberry.field
     async def match_candidates(
@@ -167,21 +202,15 @@ class Query:
         status: Optional[str] = None
     ) -> List[MatchCandidateType]:
         db: AsyncSession = info.context["db"]
-        query = select(models.MatchCandidate).where(models.MatchCandidate.tenant_id == tenant_id)
+        columns = columns_from_info(info, MATCH_CANDIDATE_COLUMNS)
+        query = lambda_stmt(
+            lambda: select(*columns).where(models.MatchCandidate.tenant_id == tenant_id),
+            track_on=[columns]
+        )
         if status:
-            query = query.where(models.MatchCandidate.status == status)
+            query += lambda s: s.where(models.MatchCandidate.status == status)
         result = await db.execute(query)
-        matches = result.scalars().all()
-        return [
-            MatchCandidateType(
-                id=m.id,
-                invoice_id=m.invoice_id,
-                transaction_id=m.transaction_id,
-                score=m.score,
-                status=m.status.value if hasattr(m.status, 'value') else m.status,
-                created_at=m.created_at.isoformat()
-            ) for m in matches
-        ]
+        return [build(MatchCandidateType, row) for row in result]
 
     @strawberry.field
     async def explain_reconciliation(
@@ -191,9 +220,12 @@ class Query:
         invoice_id: str, 
         transaction_id: str
     ) -> str:
-        db: AsyncSession = info.context["db"]
-        invoice = await db.get(models.Invoice, invoice_id)
-        transaction = await db.get(models.BankTransaction, transaction_id)
+        # Queue both loads before awaiting so they dispatch together, and are
+        # batched with any sibling explainReconciliation fields in the request.
+        invoice, transaction = await asyncio.gather(
+            info.context["invoice_loader"].load(invoice_id),
+            info.context["transaction_loader"].load(transaction_id)
+        )
         if not invoice or not transaction:
             return "Error: Invoice or Transaction not found"
         if invoice.tenant_id != tenant_id or transaction.tenant_id != tenant_id:
@@ -210,17 +242,17 @@ class Mutation:
         db.add(new_tenant)
         await db.commit()
         await db.refresh(new_tenant)
+        remember_tenant(new_tenant.id)
         return TenantType(
             id=new_tenant.id, 
             name=new_tenant.name, 
-            created_at=new_tenant.created_at.isoformat()
+            created_at=format_timestamp(new_tenant.created_at, utc=True)
         )
 
     @strawberry.mutation
     async def create_invoice(self, info: Info, tenant_id: str, input: CreateInvoiceInput) -> InvoiceType:
         db: AsyncSession = info.context["db"]
-        tenant = await db.get(models.Tenant, tenant_id)
-        if not tenant:
+        if not await tenant_exists(db, tenant_id):
             raise Exception("Tenant not found")
         new_invoice = models.Invoice(
             tenant_id=tenant_id,
@@ -232,18 +264,26 @@ class Mutation:
             vendor_id=input.vendor_id
         )
         db.add(new_invoice)
+        await bump_tenant_revision(db, tenant_id)
         await db.commit()
-        await db.refresh(new_invoice)
+        # Stands in for refresh(): created_at is the only server default, and the
+        # cursor has to come from the stored text anyway.
+        result = await db.execute(
+            select(models.Invoice.created_at, cursor_column(models.Invoice))
+            .where(models.Invoice.id == new_invoice.id)
+        )
+        created_at, cursor = result.one()
         return InvoiceType(
             id=new_invoice.id,
             amount=new_invoice.amount,
             currency=new_invoice.currency,
-            invoice_date=new_invoice.invoice_date.isoformat() if new_invoice.invoice_date else None,
+            invoice_date=format_timestamp(new_invoice.invoice_date),
             status=new_invoice.status,
             description=new_invoice.description,
             invoice_number=new_invoice.invoice_number,
             vendor_id=new_invoice.vendor_id,
-            created_at=new_invoice.created_at.isoformat()
+            created_at=format_timestamp(created_at, utc=True),
+            cursor=cursor
         )
 
     @strawberry.mutation
@@ -283,8 +323,8 @@ class Mutation:
                 invoice_id=c.invoice_id,
                 transaction_id=c.transaction_id,
                 score=c.score,
-                status=c.status.value if hasattr(c.status, 'value') else c.status,
-                created_at=c.created_at.isoformat()
+                status=models.MatchStatus(c.status).value,
+                created_at=format_timestamp(c.created_at, utc=True)
             ) for c in candidates
         ]
 
@@ -302,8 +342,8 @@ class Mutation:
             invoice_id=match.invoice_id,
             transaction_id=match.transaction_id,
             score=match.score,
-            status=match.status.value,
-            created_at=match.created_at.isoformat()
+            status=models.MatchStatus(match.status).value,
+            created_at=format_timestamp(match.created_at, utc=True)
         )
 
     @strawberry.mutation
@@ -313,6 +353,7 @@ class Mutation:
         if not invoice or invoice.tenant_id != tenant_id:
             return False
         await db.delete(invoice)
+        await bump_tenant_revision(db, tenant_id)
         await db.commit()
         return True
 
@@ -0,0 +1,52 @@
+from dataclasses import fields
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Any, Iterable, Optional, Set, Tuple, Type
+from sqlalchemy import Row, func
+from sqlalchemy.sql.elements import ColumnElement, Label
+from strawberry.types import Info
+from strawberry.types.nodes import FragmentSpread, InlineFragment, Selection
+from strawberry.utils.str_converters import to_snake_case
+
+def iso_timestamp(column: ColumnElement, utc: bool = False) -> Label:
+    # Let SQLite render the ISO-8601 string instead of hydrating a datetime per
+    # row. created_at comes from CURRENT_TIMESTAMP, which is UTC.
+    fmt = "%Y-%m-%dT%H:%M:%fZ" if utc else "%Y-%m-%dT%H:%M:%f"
+    return func.strftime(fmt, column).label(column.key)
+
+def format_timestamp(value: Optional[datetime], utc: bool = False) -> Optional[str]:
+    # Python twin of iso_timestamp so mutations return the same string as list
+    # queries; SQLite rounds %f to the nearest millisecond but clamps it at
+    # 59.999 instead of carrying into the next minute.
+    if value is None:
+        return None
+    if value.second == 59 and value.microsecond >= 999_500:
+        value = value.replace(microsecond=999_000)
+    else:
+        value += timedelta(microseconds=500)
+    text = f"{value:%Y-%m-%dT%H:%M:%S}.{value.microsecond // 1000:03d}"
+    return text + "Z" if utc else text
+
+def _requested_fields(selections: Iterable[Selection]) -> Set[str]:
+    names = set()
+    for selection in selections:
+        if isinstance(selection, (FragmentSpread, InlineFragment)):
+            names |= _requested_fields(selection.selections)
+        else:
+            names.add(to_snake_case(selection.name))
+    return names
+
+def columns_from_info(info: Info, columns: Tuple[Any, ...]) -> Tuple[Any, ...]:
+    requested = _requested_fields(info.selected_fields[0].selections)
+    # Always select something so a `__typename`-only query still gets one row per match.
+    return tuple(c for c in columns if c.key in requested) or columns[:1]
+
+@lru_cache(maxsize=None)
+def _field_names(type_cls: Type) -> Tuple[str, ...]:
+    return tuple(f.name for f in fields(type_cls))
+
+def build(type_cls: Type, row: Row) -> Any:
+    # Fields that weren't selected are never resolved, so None is a safe filler.
+    values = dict.fromkeys(_field_names(type_cls))
+    values.update(row._mapping)
+    return type_cls(**values)
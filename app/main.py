@@ -1,22 +1,29 @@
+import os
 from fastapi import FastAPI, Depends
 from contextlib import asynccontextmanager
 from strawberry.fastapi import GraphQLRouter
 from app.core.database import engine, Base, get_db
 from app.api.v1.endpoints import router as api_router
 from app.graphql.schema import schema
+from app.graphql.loaders import create_loaders
+from app.services.ai_service import close_http_client
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    # Outside local development the schema is managed by `alembic upgrade head`
+    # at deploy time, so workers don't race each other on DDL at startup.
+    if os.getenv("ENV") == "dev":
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
     yield
+    await close_http_client()
 
 app = FastAPI(title="Invoice Reconciliation API", lifespan=lifespan)
 
 app.include_router(api_router, prefix="/api/v1")
 
 async def get_context(db=Depends(get_db)):
-    return {"db": db}
+    return {"db": db, **create_loaders(db)}
 
 graphql_app = GraphQLRouter(schema, context_getter=get_context)
 app.include_router(graphql_app, prefix="/graphql")
@@ -1,12 +1,16 @@
-import uuid
 from datetime import datetime
 from enum import Enum
 from typing import Optional, List
-from sqlalchemy import String, Float, ForeignKey, DateTime, JSON
+from sqlalchemy import String, Float, ForeignKey, DateTime, Integer, LargeBinary, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.sql import func
+from ulid import ULID
 from app.core.database import Base
 
+def generate_id() -> str:
+    # ULIDs sort by creation time, so new rows append to the primary key index.
+    return str(ULID())
+
 class MatchStatus(str, Enum):
     PROPOSED = "proposed"
     CONFIRMED = "confirmed"
@@ -15,8 +19,10 @@ class MatchStatus(str, Enum):
 class Tenant(Base):
     __tablename__ = "tenants"
 
-    id: Mapped[str] = mapped_column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    id: Mapped[str] = mapped_column(String, primary_key=True, default=generate_id)
     name: Mapped[str] = mapped_column(String, nullable=False)
+    # Bumped alongside every write that changes reconcile's inputs.
+    revision: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
 
     invoices: Mapped[List["Invoice"]] = relationship(back_populates="tenant")
@@ -27,7 +33,7 @@ class Tenant(Base):
 class Vendor(Base):
     __tablename__ = "vendors"
 
-    id: Mapped[str] = mapped_column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    id: Mapped[str] = mapped_column(String, primary_key=True, default=generate_id)
     tenant_id: Mapped[str] = mapped_column(ForeignKey("tenants.id"), nullable=False, index=True)
     name: Mapped[str] = mapped_column(String, nullable=False)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
@@ -39,7 +45,7 @@ class Vendor(Base):
 class Invoice(Base):
     __tablename__ = "invoices"
 
-    id: Mapped[str] = mapped_column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    id: Mapped[str] = mapped_column(String, primary_key=True, default=generate_id)
     tenant_id: Mapped[str] = mapped_column(ForeignKey("tenants.id"), nullable=False, index=True)
     vendor_id: Mapped[Optional[str]] = mapped_column(ForeignKey("vendors.id"), nullable=True, index=True)
     invoice_number: Mapped[Optional[str]] = mapped_column(String, nullable=True)
@@ -54,11 +60,17 @@ class Invoice(Base):
     vendor: Mapped[Optional["Vendor"]] = relationship(back_populates="invoices")
     matches: Mapped[List["MatchCandidate"]] = relationship(back_populates="invoice", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        Index("ix_invoices_tenant_status_created", "tenant_id", "status", "created_at"),
+        Index("ix_invoices_tenant_amount", "tenant_id", "amount"),
+        Index("ix_invoices_tenant_created_id", "tenant_id", "created_at", "id"),
+    )
+
 
 class BankTransaction(Base):
     __tablename__ = "bank_transactions"
 
-    id: Mapped[str] = mapped_column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    id: Mapped[str] = mapped_column(String, primary_key=True, default=generate_id)
     tenant_id: Mapped[str] = mapped_column(ForeignKey("tenants.id"), nullable=False, index=True)
     external_id: Mapped[Optional[str]] = mapped_column(String, nullable=True)
     posted_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
@@ -70,11 +82,16 @@ class BankTransaction(Base):
     tenant: Mapped["Tenant"] = relationship(back_populates="transactions")
     matches: Mapped[List["MatchCandidate"]] = relationship(back_populates="transaction", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        Index("ix_tx_tenant_posted", "tenant_id", "posted_at"),
+        Index("ix_tx_tenant_created_id", "tenant_id", "created_at", "id"),
+    )
+
 
 class MatchCandidate(Base):
     __tablename__ = "match_candidates"
 
-    id: Mapped[str] = mapped_column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    id: Mapped[str] = mapped_column(String, primary_key=True, default=generate_id)
     tenant_id: Mapped[str] = mapped_column(ForeignKey("tenants.id"), nullable=False, index=True)
     invoice_id: Mapped[str] = mapped_column(ForeignKey("invoices.id", ondelete="CASCADE"), nullable=False)
     transaction_id: Mapped[str] = mapped_column(ForeignKey("bank_transactions.id", ondelete="CASCADE"), nullable=False)
@@ -92,6 +109,6 @@ class IdempotencyKey(Base):
     key: Mapped[str] = mapped_column(String, primary_key=True)
     tenant_id: Mapped[str] = mapped_column(ForeignKey("tenants.id"), nullable=False, index=True)
     params_hash: Mapped[str] = mapped_column(String, nullable=True)
-    response_payload: Mapped[Optional[dict]] = mapped_column(JSON, nullable=True)
+    response_body: Mapped[Optional[bytes]] = mapped_column(LargeBinary, nullable=True)
     locked_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
@@ -1,3 +1,4 @@
+import msgspec
 from pydantic import BaseModel, ConfigDict
 from datetime import datetime
 from typing import List, Optional
@@ -33,7 +34,11 @@ class InvoiceResponse(BaseModel):
     created_at: datetime
     model_config = ConfigDict(from_attributes=True)
 
-class TransactionCreate(BaseModel):
+class InvoicePage(BaseModel):
+    items: List[InvoiceResponse]
+    next_cursor: Optional[str] = None
+
+class TransactionCreate(msgspec.Struct, kw_only=True):
     amount: float
     currency: str = "USD"
     posted_at: str
@@ -1,10 +1,36 @@
 import os
+from typing import Optional
 from dotenv import load_dotenv
 import httpx
+from cachetools import TTLCache
+from urllib.parse import quote
 from app.models import Invoice, BankTransaction
 
 load_dotenv()
 
+_client: Optional[httpx.AsyncClient] = None
+
+# Keyed by the full prompt, so any change to the invoice or transaction fields it
+# quotes produces a fresh explanation. Fallback answers are never cached.
+_explanations: TTLCache = TTLCache(maxsize=10_000, ttl=86_400)
+
+def _get_client() -> httpx.AsyncClient:
+    # Created lazily so a new app lifespan gets a fresh client after shutdown
+    # closed the previous one.
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            timeout=10.0,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+        )
+    return _client
+
+async def close_http_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
 class AIService:
     def __init__(self):
         self.base_url = os.getenv("AI_API_URL", "https://text.pollinations.ai/")
@@ -16,12 +42,16 @@ class AIService:
                 f"Invoice: {invoice.amount} {invoice.currency}, Date: {invoice.invoice_date}, Desc: {invoice.description}. "
                 f"Transaction: {tx.amount} {tx.currency}, Date: {tx.posted_at}, Desc: {tx.description}."
             )
-            url = f"{self.base_url}{prompt}"
-            async with httpx.AsyncClient() as client:
-                response = await client.get(url, timeout=10.0)
-                if response.status_code == 200:
-                    return response.text.strip()
-                else:
-                    raise Exception(f"API Error: {response.status_code}")
+            cached = _explanations.get(prompt)
+            if cached is not None:
+                return cached
+            url = self.base_url + quote(prompt, safe="")
+            response = await _get_client().get(url)
+            if response.status_code == 200:
+                explanation = response.text.strip()
+                _explanations[prompt] = explanation
+                return explanation
+            else:
+                raise Exception(f"API Error: {response.status_code}")
         except Exception:
             return f"Heuristic match based on amount similarity ({invoice.amount} == {tx.amount})"
\ No newline at end of file
@@ -1,12 +1,13 @@
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy import select, insert, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from fastapi import HTTPException
-from app.models import BankTransaction, IdempotencyKey
+from app.models import BankTransaction, IdempotencyKey, generate_id
+from app.services.reconciliation import bump_tenant_revision
 import hashlib
-import json
+import orjson
 
 class ImportService:
     def __init__(self, session: AsyncSession):
@@ -18,11 +19,31 @@ class ImportService:
         transactions_data: List[Dict[str, Any]], 
         idempotency_key: str
     ) -> Dict[str, Any]:
+        result, body = await self._import(tenant_id, transactions_data, idempotency_key)
+        return result if result is not None else orjson.loads(body)
+
+    async def import_transactions_json(
+        self,
+        tenant_id: str,
+        transactions_data: List[Dict[str, Any]],
+        idempotency_key: str
+    ) -> bytes:
+        _, body = await self._import(tenant_id, transactions_data, idempotency_key)
+        return body
+
+    async def _import(
+        self,
+        tenant_id: str,
+        transactions_data: List[Dict[str, Any]],
+        idempotency_key: str
+    ) -> Tuple[Optional[Dict[str, Any]], bytes]:
+        # Replays return only the stored JSON body (result is None) so callers
+        # that send it straight back never decode it.
         if not idempotency_key:
              raise HTTPException(status_code=400, detail="Idempotency-Key header is required")
 
-        payload_str = json.dumps(transactions_data, sort_keys=True, default=str)
-        current_hash = hashlib.sha256(payload_str.encode()).hexdigest()
+        payload_bytes = orjson.dumps(transactions_data, option=orjson.OPT_SORT_KEYS, default=str)
+        current_hash = hashlib.blake2b(payload_bytes, digest_size=32).hexdigest()
 
         stmt = select(IdempotencyKey).where(
             IdempotencyKey.key == idempotency_key,
@@ -34,57 +55,60 @@ class ImportService:
             if existing_key.params_hash and existing_key.params_hash != current_hash:
                  raise HTTPException(status_code=409, detail="Idempotency key reused with different payload")
 
-            if existing_key.response_payload:
-                return existing_key.response_payload
+            if existing_key.response_body:
+                return None, existing_key.response_body
             else:
                 raise HTTPException(status_code=409, detail="Request currently in progress or failed previously")
 
-        new_key = IdempotencyKey(
-            key=idempotency_key, 
-            tenant_id=tenant_id, 
+        # Claim the key, insert the rows and record the response in a single
+        # transaction; a concurrent request with the same key either loses the
+        # ON CONFLICT race or waits on SQLite's write lock and replays our result.
+        claim = sqlite_insert(IdempotencyKey).values(
+            key=idempotency_key,
+            tenant_id=tenant_id,
             params_hash=current_hash,
-            response_payload=None
-        )
-        self.session.add(new_key)
-        
-        try:
-            await self.session.commit()
-        except IntegrityError:
+            response_body=None
+        ).on_conflict_do_nothing(index_elements=["key"])
+
+        if (await self.session.execute(claim)).rowcount == 0:
             await self.session.rollback()
             existing = (await self.session.execute(stmt)).scalar_one_or_none()
-            if existing and existing.response_payload:
-                return existing.response_payload
+            if existing and existing.response_body:
+                return None, existing.response_body
             raise HTTPException(status_code=409, detail="Concurrent request in progress")
 
         try:
-            created_transactions = []
-            for tx_data in transactions_data:
-                tx = BankTransaction(
-                    tenant_id=tenant_id,
-                    amount=tx_data["amount"],
-                    currency=tx_data["currency"],
-                    posted_at=datetime.fromisoformat(tx_data["posted_at"]),
-                    description=tx_data["description"],
-                    external_id=tx_data["external_id"]
-                )
-                self.session.add(tx)
-                created_transactions.append(tx)
-            
-            await self.session.commit()
-            
+            rows = [
+                {
+                    "id": generate_id(),
+                    "tenant_id": tenant_id,
+                    "amount": tx_data["amount"],
+                    "currency": tx_data["currency"],
+                    "posted_at": datetime.fromisoformat(tx_data["posted_at"]),
+                    "description": tx_data["description"],
+                    "external_id": tx_data["external_id"]
+                } for tx_data in transactions_data
+            ]
+            if rows:
+                await self.session.execute(insert(BankTransaction), rows)
+                await bump_tenant_revision(self.session, tenant_id)
+
             result = {
                 "message": "Import successful",
-                "count": len(created_transactions),
-                "transaction_ids": [t.id for t in created_transactions]
+                "count": len(rows),
+                "transaction_ids": [row["id"] for row in rows]
             }
+            body = orjson.dumps(result)
 
-            new_key.response_payload = result
+            await self.session.execute(
+                update(IdempotencyKey)
+                .where(IdempotencyKey.key == idempotency_key)
+                .values(response_body=body)
+            )
             await self.session.commit()
-            
-            return result
-            
-        except Exception as e:
+
+            return result, body
+
+        except Exception:
             await self.session.rollback()
-            await self.session.delete(new_key)
-            await self.session.commit()
-            raise e
+            raise
@@ -1,62 +1,309 @@
-from typing import List
-from sqlalchemy import select
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from operator import attrgetter
+from sys import intern
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from cachetools import TTLCache
+from sqlalchemy import insert, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.models import Invoice, BankTransaction, MatchCandidate, MatchStatus
+from app.models import Invoice, BankTransaction, MatchCandidate, MatchStatus, Tenant
 from difflib import SequenceMatcher
 
+try:
+    from difflib_fast import ratio as _fast_ratio
+except ImportError:
+    _fast_ratio = None
+
+SCORE_THRESHOLD = 0.3
+SIMILARITY_WEIGHT = 0.2
+STREAM_BATCH_SIZE = 1000
+EPOCH = datetime(1970, 1, 1)
+DAY_MICROSECONDS = 86_400_000_000
+# Date component by whole days elapsed: 0-3 days, 4-7 days, anything further.
+DATE_SCORES = np.array([0.2] * 4 + [0.1] * 4 + [0.0], dtype=np.float64)
+
+# SequenceMatcher only applies its autojunk heuristic once the second string
+# reaches 200 characters; below that difflib_fast returns the identical ratio.
+AUTOJUNK_MIN_LENGTH = 200
+
+def _epoch_microseconds(value: datetime) -> int:
+    # SQLite hands back naive UTC; aware values (e.g. from Postgres) are
+    # normalised to the same so the two never meet in one subtraction.
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return (value - EPOCH) // timedelta(microseconds=1)
+
+def _component_scores(
+    invoice_amounts: np.ndarray,
+    invoice_currencies: np.ndarray,
+    invoice_dates: np.ndarray,
+    has_date: np.ndarray,
+    tx_amounts: np.ndarray,
+    tx_currencies: np.ndarray,
+    tx_dates: np.ndarray
+) -> np.ndarray:
+    # Amount and date components for a batch of pairs, one element per pair.
+    # Currencies are small integer codes and dates are epoch microseconds, so
+    # the whole kernel runs on numeric arrays.
+    amount_match = (np.abs(invoice_amounts - tx_amounts) < 0.01) & (invoice_currencies == tx_currencies)
+    # Floor division of the microsecond gap matches timedelta.days exactly;
+    # whole-day ordinals would not, since they drop the time of day.
+    date_diff = np.abs((invoice_dates - tx_dates) // DAY_MICROSECONDS)
+    # One table lookup instead of chained comparisons; undated invoices are sent
+    # to the last (zero) slot.
+    date_slot = np.where(has_date, np.minimum(date_diff, len(DATE_SCORES) - 1), len(DATE_SCORES) - 1)
+    return np.where(amount_match, 0.6, 0.0) + DATE_SCORES[date_slot]
+
+def _similarity(a: str, b: str) -> float:
+    # Identical memos are common (supplier-generated references) and are where
+    # find_longest_match does the most work for a foregone 1.0.
+    if a == b:
+        return 1.0
+    if _fast_ratio is not None and len(b) < AUTOJUNK_MIN_LENGTH:
+        return _fast_ratio(a, b)
+    return SequenceMatcher(None, a, b).ratio()
+
+def _may_clear_threshold(score: float, a: str, b: str) -> bool:
+    # real_quick_ratio (the length bound) and quick_ratio (the shared-character
+    # bound) are both upper bounds on ratio(); if the bound can't lift the score
+    # over the threshold, the full comparison is skipped. quick_ratio is only
+    # worth its cost when the pair would otherwise go through SequenceMatcher.
+    bound = 2.0 * min(len(a), len(b)) / (len(a) + len(b))
+    if round(score + bound * SIMILARITY_WEIGHT, 3) <= SCORE_THRESHOLD:
+        return False
+    if _fast_ratio is None or len(b) >= AUTOJUNK_MIN_LENGTH:
+        bound = SequenceMatcher(None, a, b).quick_ratio()
+        return round(score + bound * SIMILARITY_WEIGHT, 3) > SCORE_THRESHOLD
+    return True
+
+def _similarities(pairs: List[Tuple[str, str]]) -> List[float]:
+    # difflib_fast scores a whole batch in parallel with the GIL released.
+    if _fast_ratio is not None and all(len(b) < AUTOJUNK_MIN_LENGTH for _, b in pairs):
+        ratios = iter(_fast_ratio([(a, b) for a, b in pairs if a != b]))
+        return [1.0 if a == b else next(ratios) for a, b in pairs]
+    return [_similarity(a, b) for a, b in pairs]
+
+INVOICE_COLUMNS = (
+    Invoice.id,
+    Invoice.amount,
+    Invoice.currency,
+    Invoice.invoice_date,
+    Invoice.description
+)
+TRANSACTION_COLUMNS = (
+    BankTransaction.id,
+    BankTransaction.amount,
+    BankTransaction.currency,
+    BankTransaction.posted_at,
+    BankTransaction.description
+)
+
+# The last result per tenant, keyed by the tenant's revision. The revision
+# lives in the database, so a write through any worker invalidates every
+# worker's entry.
+_recent_results: TTLCache = TTLCache(maxsize=10_000, ttl=300)
+
+async def bump_tenant_revision(session: AsyncSession, tenant_id: str) -> None:
+    # Call in the same transaction as any invoice or transaction create/delete.
+    await session.execute(
+        update(Tenant).where(Tenant.id == tenant_id).values(revision=Tenant.revision + 1)
+    )
+
 class ReconciliationService:
     def __init__(self, session: AsyncSession):
         self.session = session
 
     async def reconcile(self, tenant_id: str) -> List[MatchCandidate]:
-        stmt_invoices = select(Invoice).where(
-            Invoice.tenant_id == tenant_id,
-            Invoice.status == "open"
+        revision = await self.session.scalar(select(Tenant.revision).where(Tenant.id == tenant_id))
+        cached = _recent_results.get(tenant_id)
+        if cached is not None and cached[0] == revision:
+            candidates = await self._load_candidates(cached[1])
+            if candidates is not None:
+                return candidates
+
+        candidates = await self._reconcile(tenant_id)
+        _recent_results[tenant_id] = (revision, [c.id for c in candidates])
+        return candidates
+
+    async def _load_candidates(self, candidate_ids: List[str]) -> Optional[List[MatchCandidate]]:
+        # Reloaded rather than reused so callers see current statuses; a missing
+        # row means the cached result no longer holds.
+        if not candidate_ids:
+            return []
+        result = await self.session.scalars(select(MatchCandidate).where(MatchCandidate.id.in_(candidate_ids)))
+        by_id = {c.id: c for c in result}
+        if len(by_id) != len(candidate_ids):
+            return None
+        return [by_id[i] for i in candidate_ids]
+
+    async def _reconcile(self, tenant_id: str) -> List[MatchCandidate]:
+        # Only the scored columns are fetched, and both queries are streamed in
+        # batches so no more than STREAM_BATCH_SIZE raw rows are resident at once.
+        stmt_transactions = (
+            select(*TRANSACTION_COLUMNS)
+            .where(BankTransaction.tenant_id == tenant_id)
+            .execution_options(yield_per=STREAM_BATCH_SIZE)
         )
-        invoices = (await self.session.execute(stmt_invoices)).scalars().all()
+        tx_ids = []
+        tx_amounts = []
+        tx_currencies = []
+        currency_codes = {}
+        tx_posted_at = []
+        tx_descriptions = []
+        by_amount = defaultdict(list)
+        by_day = defaultdict(list)
+
+        result = await self.session.stream(stmt_transactions)
+        async for partition in result.partitions():
+            # Rows are unpacked straight into locals; nothing below touches a Row.
+            for tx_id, amount, currency, posted_at, description in partition:
+                position = len(tx_ids)
+                posted_at = _epoch_microseconds(posted_at)
+                tx_ids.append(tx_id)
+                tx_amounts.append(amount)
+                tx_currencies.append(currency_codes.setdefault(currency, len(currency_codes)))
+                tx_posted_at.append(posted_at)
+                by_amount[(currency, round(amount * 100))].append(position)
+                if description:
+                    # Interned so repeated memos share one object and compare by identity.
+                    tx_descriptions.append(intern(description.lower()))
+                    by_day[posted_at // DAY_MICROSECONDS].append(position)
+                else:
+                    tx_descriptions.append(None)
 
-        stmt_transactions = select(BankTransaction).where(
-            BankTransaction.tenant_id == tenant_id
+        tx_columns = (
+            np.array(tx_amounts, dtype=np.float64),
+            np.array(tx_currencies, dtype=np.int16),
+            np.array(tx_posted_at, dtype=np.int64)
         )
-        transactions = (await self.session.execute(stmt_transactions)).scalars().all()
-        
+
+        stmt_invoices = (
+            select(*INVOICE_COLUMNS)
+            .where(Invoice.tenant_id == tenant_id, Invoice.status == "open")
+            .execution_options(yield_per=STREAM_BATCH_SIZE)
+        )
+        scored = []
+        description_pairs = []
+
+        result = await self.session.stream(stmt_invoices)
+        async for invoices in result.partitions():
+            invoice_ids, amounts, currencies, dates, descriptions = zip(*invoices)
+            # Dates are normalised to epoch microseconds once per invoice and
+            # shared by blocking and scoring.
+            dates = [_epoch_microseconds(d) if d else None for d in dates]
+            descriptions = [intern(d.lower()) if d else None for d in descriptions]
+
+            invoice_positions = []
+            tx_positions = []
+            for invoice_position, (amount, currency, date, description) in enumerate(
+                zip(amounts, currencies, dates, descriptions)
+            ):
+                blocked = self._blocked_transactions(amount, currency, date, description, by_amount, by_day)
+                invoice_positions.extend([invoice_position] * len(blocked))
+                tx_positions.extend(blocked)
+
+            base_scores = self._base_scores(amounts, currencies, dates, invoice_positions, tx_positions, tx_columns, currency_codes)
+
+            threshold = SCORE_THRESHOLD
+            weight = SIMILARITY_WEIGHT
+            for invoice_position, position, score in zip(invoice_positions, tx_positions, base_scores):
+                invoice_description = descriptions[invoice_position]
+                tx_description = tx_descriptions[position]
+                has_descriptions = bool(invoice_description and tx_description)
+                # Drop pairs that can't clear the threshold even with identical
+                # descriptions before any similarity work is done.
+                best_score = score + weight if has_descriptions else score
+                if round(best_score, 3) <= threshold:
+                    continue
+                if has_descriptions:
+                    if score <= threshold and not _may_clear_threshold(score, invoice_description, tx_description):
+                        continue
+                    description_pairs.append((invoice_description, tx_description))
+                scored.append((invoice_ids[invoice_position], tx_ids[position], score, has_descriptions))
+
+        similarities = iter(_similarities(description_pairs))
+        rows = []
+
+        for invoice_id, tx_id, score, has_descriptions in scored:
+            if has_descriptions:
+                score += (next(similarities) * SIMILARITY_WEIGHT)
+            score = min(round(score, 3), 1.0)
+            if score > SCORE_THRESHOLD:
+                rows.append({
+                    "tenant_id": tenant_id,
+                    "invoice_id": invoice_id,
+                    "transaction_id": tx_id,
+                    "score": score,
+                    "status": MatchStatus.PROPOSED
+                })
+
         candidates = []
+        if rows:
+            # One executemany INSERT ... RETURNING instead of a flush per candidate;
+            # RETURNING also hands back the server-side created_at.
+            result = await self.session.scalars(
+                insert(MatchCandidate).returning(MatchCandidate, sort_by_parameter_order=True),
+                rows
+            )
+            candidates = list(result)
+            await self.session.commit()
+
+        candidates.sort(key=attrgetter("score"), reverse=True)
+        return candidates
+
+    def _blocked_transactions(
+        self,
+        amount: float,
+        currency: str,
+        invoice_date: Optional[int],
+        description: Optional[str],
+        by_amount: Dict[Tuple[str, int], List[int]],
+        by_day: Dict[int, List[int]]
+    ) -> List[int]:
+        # A pair can only clear the 0.3 threshold with the amount bonus, or with
+        # the 3-day date bonus plus a description similarity above 0.5. Anything
+        # outside those two buckets is never scored.
+        cents = round(amount * 100)
+        positions = set()
+        for key in (cents - 1, cents, cents + 1):
+            positions.update(by_amount.get((currency, key), ()))
+        if invoice_date is not None and description:
+            # timedelta.days floors, so allow a day of slack either side.
+            day = invoice_date // DAY_MICROSECONDS
+            for key in range(day - 4, day + 5):
+                positions.update(by_day.get(key, ()))
+        # Score in query order so equal scores keep the same ranking as before.
+        return sorted(positions)
 
-        for invoice in invoices:
-            for tx in transactions:
-                score = self._calculate_score(invoice, tx)
-                if score > 0.3:
-                    candidate = MatchCandidate(
-                        tenant_id=tenant_id,
-                        invoice_id=invoice.id,
-                        transaction_id=tx.id,
-                        score=score,
-                        status=MatchStatus.PROPOSED
-                    )
-                    candidates.append(candidate)
-                    self.session.add(candidate)
-        
-        await self.session.commit()
-        return rounded_candidates(sorted(candidates, key=lambda x: x.score, reverse=True))
-
-    def _calculate_score(self, invoice: Invoice, tx: BankTransaction) -> float:
-        score = 0.0
-        
-        if abs(invoice.amount - tx.amount) < 0.01 and invoice.currency == tx.currency:
-            score += 0.6
-        
-        if invoice.invoice_date:
-            date_diff = abs((invoice.invoice_date - tx.posted_at).days)
-            if date_diff <= 3:
-                score += 0.2
-            elif date_diff <= 7:
-                score += 0.1
-            
-        if invoice.description and tx.description:
-            similarity = SequenceMatcher(None, invoice.description.lower(), tx.description.lower()).ratio()
-            score += (similarity * 0.2)
-            
-        return min(round(score, 3), 1.0)
-
-def rounded_candidates(candidates: List[MatchCandidate]) -> List[MatchCandidate]:
-    return candidates
+    def _base_scores(
+        self,
+        amounts: Sequence[float],
+        currencies: Sequence[str],
+        dates: List[Optional[int]],
+        invoice_positions: List[int],
+        tx_positions: List[int],
+        tx_columns: Tuple[np.ndarray, np.ndarray, np.ndarray],
+        currency_codes: Dict[str, int]
+    ) -> List[float]:
+        invoice_index = np.asarray(invoice_positions, dtype=np.intp)
+        tx_index = np.asarray(tx_positions, dtype=np.intp)
+        tx_amounts, tx_currencies, tx_posted_at = tx_columns
+
+        invoice_amounts = np.array(amounts, dtype=np.float64)
+        # A currency no transaction uses gets -1, which never matches a code.
+        invoice_currencies = np.array([currency_codes.get(c, -1) for c in currencies], dtype=np.int16)
+        has_date = np.array([d is not None for d in dates], dtype=bool)
+        invoice_dates = np.array([d or 0 for d in dates], dtype=np.int64)
+
+        scores = _component_scores(
+            invoice_amounts[invoice_index],
+            invoice_currencies[invoice_index],
+            invoice_dates[invoice_index],
+            has_date[invoice_index],
+            tx_amounts[tx_index],
+            tx_currencies[tx_index],
+            tx_posted_at[tx_index]
+        )
+        # tolist() hands back Python floats, so the later round() is the builtin.
+        return scores.tolist()
@@ -1,44 +1,73 @@
 import pytest
 import pytest_asyncio
 from httpx import AsyncClient, ASGITransport
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.pool import StaticPool
 from app.core.database import Base, get_db
 from app.main import app
 
 TEST_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
 
+# One shared in-memory connection for the whole run: the schema is created once
+# and every test runs inside a transaction that is rolled back afterwards.
 engine = create_async_engine(
     TEST_DATABASE_URL,
+    poolclass=StaticPool,
     connect_args={"check_same_thread": False},
     echo=False,
 )
 
-TestingSessionLocal = async_sessionmaker(
-    bind=engine,
-    class_=AsyncSession,
-    expire_on_commit=False,
-    autoflush=False,
-)
+# pysqlite's own transaction handling breaks SAVEPOINTs; let SQLAlchemy emit BEGIN.
+@event.listens_for(engine.sync_engine, "connect")
+def _disable_driver_transactions(dbapi_connection, connection_record):
+    dbapi_connection.isolation_level = None
 
-@pytest_asyncio.fixture(scope="function")
-async def db_session():
+@event.listens_for(engine.sync_engine, "begin")
+def _emit_begin(conn):
+    conn.exec_driver_sql("BEGIN")
+
+@pytest_asyncio.fixture(scope="session", autouse=True)
+async def create_schema():
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
-    
-    async with TestingSessionLocal() as session:
+    yield
+    await engine.dispose()
+
+@pytest_asyncio.fixture(scope="function")
+async def db_session():
+    async with engine.connect() as conn:
+        transaction = await conn.begin()
+        # Commits inside the code under test only release a SAVEPOINT.
+        session = AsyncSession(
+            bind=conn,
+            expire_on_commit=False,
+            autoflush=False,
+            join_transaction_mode="create_savepoint",
+        )
         yield session
-    
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.drop_all)
+        await session.close()
+        await transaction.rollback()
+
+@pytest.fixture
+def statements():
+    executed = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+    yield executed
+    event.remove(engine.sync_engine, "before_cursor_execute", record)
 
 @pytest_asyncio.fixture(scope="function")
 async def client(db_session):
     async def override_get_db():
         yield db_session
-    
+
     app.dependency_overrides[get_db] = override_get_db
-    
+
     async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
         yield ac
-    
+
     app.dependency_overrides.clear()
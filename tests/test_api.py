@@ -1,5 +1,7 @@
 import pytest
 from httpx import AsyncClient
+from app.main import app
+from app.services import ai_service
 
 @pytest.mark.asyncio
 async def test_tenant_isolation(client: AsyncClient):
@@ -22,12 +24,12 @@ async def test_tenant_isolation(client: AsyncClient):
     
     get_a = await client.get(f"/api/v1/tenants/{tenant_a_id}/invoices")
     assert get_a.status_code == 200
-    assert len(get_a.json()) == 1
-    assert get_a.json()[0]["tenant_id"] == tenant_a_id
+    assert len(get_a.json()["items"]) == 1
+    assert get_a.json()["items"][0]["tenant_id"] == tenant_a_id
 
     get_b = await client.get(f"/api/v1/tenants/{tenant_b_id}/invoices")
     assert get_b.status_code == 200
-    assert len(get_b.json()) == 0
+    assert len(get_b.json()["items"]) == 0
 
     resp = await client.post("/api/v1/tenants/invalid-id/invoices", json=inv_data)
     assert resp.status_code == 404
@@ -45,7 +47,7 @@ async def test_delete_invoice(client: AsyncClient):
     assert del_resp.status_code == 200
     
     get_resp = await client.get(f"/api/v1/tenants/{tenant_id}/invoices")
-    assert len(get_resp.json()) == 0
+    assert len(get_resp.json()["items"]) == 0
 
 @pytest.mark.asyncio
 async def test_list_invoices_with_status_filter(client: AsyncClient):
@@ -60,13 +62,13 @@ async def test_list_invoices_with_status_filter(client: AsyncClient):
     })
     
     all_invoices = await client.get(f"/api/v1/tenants/{tenant_id}/invoices")
-    assert len(all_invoices.json()) == 2
+    assert len(all_invoices.json()["items"]) == 2
     
     open_invoices = await client.get(f"/api/v1/tenants/{tenant_id}/invoices?status=open")
-    assert len(open_invoices.json()) == 2
+    assert len(open_invoices.json()["items"]) == 2
     
     matched_invoices = await client.get(f"/api/v1/tenants/{tenant_id}/invoices?status=matched")
-    assert len(matched_invoices.json()) == 0
+    assert len(matched_invoices.json()["items"]) == 0
 
 @pytest.mark.asyncio
 async def test_list_invoices_with_amount_filter(client: AsyncClient):
@@ -78,8 +80,61 @@ async def test_list_invoices_with_amount_filter(client: AsyncClient):
     await client.post(f"/api/v1/tenants/{tenant_id}/invoices", json={"amount": 300, "currency": "USD"})
     
     filtered = await client.get(f"/api/v1/tenants/{tenant_id}/invoices?amount_min=100&amount_max=200")
-    assert len(filtered.json()) == 1
-    assert filtered.json()[0]["amount"] == 150
+    assert len(filtered.json()["items"]) == 1
+    assert filtered.json()["items"][0]["amount"] == 150
+
+@pytest.mark.asyncio
+async def test_list_invoices_keyset_pagination(client: AsyncClient):
+    resp_t = await client.post("/api/v1/tenants", json={"name": "Paging Test"})
+    tenant_id = resp_t.json()["id"]
+
+    created = set()
+    for amount in range(1, 6):
+        resp = await client.post(f"/api/v1/tenants/{tenant_id}/invoices", json={"amount": amount, "currency": "USD"})
+        created.add(resp.json()["id"])
+
+    seen = []
+    cursor = None
+    while True:
+        params = {"limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        page = (await client.get(f"/api/v1/tenants/{tenant_id}/invoices", params=params)).json()
+        assert len(page["items"]) <= 2
+        seen.extend(i["id"] for i in page["items"])
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+
+    assert len(seen) == 5
+    assert set(seen) == created
+
+    bad = await client.get(f"/api/v1/tenants/{tenant_id}/invoices", params={"cursor": "!!"})
+    assert bad.status_code == 400
+
+@pytest.mark.asyncio
+async def test_list_invoices_cursor_survives_anchor_delete(client: AsyncClient):
+    resp_t = await client.post("/api/v1/tenants", json={"name": "Paging Delete"})
+    tenant_id = resp_t.json()["id"]
+    created = set()
+    for amount in range(1, 8):
+        resp = await client.post(f"/api/v1/tenants/{tenant_id}/invoices", json={"amount": amount, "currency": "USD"})
+        created.add(resp.json()["id"])
+
+    url = f"/api/v1/tenants/{tenant_id}/invoices"
+    page = (await client.get(url, params={"limit": 2})).json()
+    assert "cursor" not in page["items"][0]
+    seen = [i["id"] for i in page["items"]]
+    await client.delete(f"{url}/{seen[-1]}")
+
+    cursor = page["next_cursor"]
+    while cursor:
+        page = (await client.get(url, params={"limit": 2, "cursor": cursor})).json()
+        seen.extend(i["id"] for i in page["items"])
+        cursor = page["next_cursor"]
+
+    assert len(seen) == 7
+    assert set(seen) == created
 
 @pytest.mark.asyncio
 async def test_confirm_match(client: AsyncClient, db_session):
@@ -137,3 +192,56 @@ async def test_ai_explanation_endpoint(client: AsyncClient):
     assert explain_resp.status_code == 200
     assert "explanation" in explain_resp.json()
     assert len(explain_resp.json()["explanation"]) > 0
+
+@pytest.mark.asyncio
+async def test_import_replay_returns_stored_body(client: AsyncClient):
+    resp_t = await client.post("/api/v1/tenants", json={"name": "Replay Test"})
+    tenant_id = resp_t.json()["id"]
+
+    payload = [{"amount": 5, "currency": "USD", "posted_at": "2023-01-01T00:00:00", "description": "fee"}]
+    first = await client.post(f"/api/v1/tenants/{tenant_id}/bank-transactions/import",
+        json=payload, headers={"Idempotency-Key": "replay-1"})
+    second = await client.post(f"/api/v1/tenants/{tenant_id}/bank-transactions/import",
+        json=payload, headers={"Idempotency-Key": "replay-1"})
+
+    assert first.status_code == second.status_code == 200
+    assert second.headers["content-type"] == "application/json"
+    assert second.content == first.content
+    assert second.json()["count"] == 1
+
+@pytest.mark.asyncio
+async def test_import_rejects_invalid_transactions(client: AsyncClient):
+    resp_t = await client.post("/api/v1/tenants", json={"name": "Validation Test"})
+    tenant_id = resp_t.json()["id"]
+
+    url = f"/api/v1/tenants/{tenant_id}/bank-transactions/import"
+    missing = await client.post(url, json=[{"amount": 5, "posted_at": "2023-01-01T00:00:00"}],
+        headers={"Idempotency-Key": "invalid-1"})
+    assert missing.status_code == 422
+    assert "description" in missing.json()["detail"]
+
+    malformed = await client.post(url, content=b"[{", headers={"Idempotency-Key": "invalid-2"})
+    assert malformed.status_code == 422
+
+@pytest.mark.asyncio
+async def test_explain_missing_or_foreign_resources(client: AsyncClient):
+    tenant_id = (await client.post("/api/v1/tenants", json={"name": "Explain A"})).json()["id"]
+    other_id = (await client.post("/api/v1/tenants", json={"name": "Explain B"})).json()["id"]
+
+    invoice_id = (await client.post(f"/api/v1/tenants/{tenant_id}/invoices", json={"amount": 10.0})).json()["id"]
+    imported = await client.post(f"/api/v1/tenants/{other_id}/bank-transactions/import",
+        json=[{"amount": 10.0, "posted_at": "2023-01-01T00:00:00", "description": "x"}],
+        headers={"Idempotency-Key": "explain-foreign"})
+    tx_id = imported.json()["transaction_ids"][0]
+
+    url = f"/api/v1/tenants/{tenant_id}/reconcile/explain"
+    missing = await client.get(url, params={"invoice_id": invoice_id, "transaction_id": "nope"})
+    assert missing.status_code == 404
+    foreign = await client.get(url, params={"invoice_id": invoice_id, "transaction_id": tx_id})
+    assert foreign.status_code == 403
+
+@pytest.mark.asyncio
+async def test_http_client_survives_lifespan_restart():
+    for _ in range(2):
+        async with app.router.lifespan_context(app):
+            assert not ai_service._get_client().is_closed
@@ -0,0 +1,189 @@
+import pytest
+from httpx import AsyncClient
+
+async def gql(client: AsyncClient, query: str, variables: dict = None) -> dict:
+    resp = await client.post("/graphql", json={"query": query, "variables": variables or {}})
+    assert resp.status_code == 200
+    body = resp.json()
+    assert "errors" not in body, body.get("errors")
+    return body["data"]
+
+CREATE_TENANT = "mutation($name: String!) { createTenant(input: {name: $name}) { id name } }"
+CREATE_INVOICE = """
+mutation($tenantId: String!, $amount: Float!) {
+    createInvoice(tenantId: $tenantId, input: {amount: $amount, invoiceDate: "2023-01-01T00:00:00"}) { id status }
+}
+"""
+
+@pytest.mark.asyncio
+async def test_graphql_invoice_lifecycle(client: AsyncClient):
+    tenant = (await gql(client, CREATE_TENANT, {"name": "GQL Tenant"}))["createTenant"]
+    other = (await gql(client, CREATE_TENANT, {"name": "Other Tenant"}))["createTenant"]
+
+    invoice = (await gql(client, CREATE_INVOICE, {"tenantId": tenant["id"], "amount": 10.0}))["createInvoice"]
+    assert invoice["status"] == "open"
+
+    resp = await client.post("/graphql", json={
+        "query": CREATE_INVOICE, "variables": {"tenantId": "missing", "amount": 1.0}
+    })
+    assert "Tenant not found" in resp.json()["errors"][0]["message"]
+
+    delete = "mutation($t: String!, $i: String!) { deleteInvoice(tenantId: $t, invoiceId: $i) }"
+    assert (await gql(client, delete, {"t": other["id"], "i": invoice["id"]}))["deleteInvoice"] is False
+    assert (await gql(client, delete, {"t": tenant["id"], "i": invoice["id"]}))["deleteInvoice"] is True
+
+    data = await gql(client, "query($t: String!) { invoices(tenantId: $t) { id } }", {"t": tenant["id"]})
+    assert data["invoices"] == []
+
+@pytest.mark.asyncio
+async def test_graphql_explain_batches_lookups(client: AsyncClient, statements):
+    tenant = (await gql(client, CREATE_TENANT, {"name": "Explain Tenant"}))["createTenant"]
+    invoice = (await gql(client, CREATE_INVOICE, {"tenantId": tenant["id"], "amount": 10.0}))["createInvoice"]
+
+    query = """
+    query($t: String!, $i: String!) {
+        missing: explainReconciliation(tenantId: $t, invoiceId: $i, transactionId: "nope")
+        again: explainReconciliation(tenantId: $t, invoiceId: "nope", transactionId: "nope")
+    }
+    """
+    statements.clear()
+    data = await gql(client, query, {"t": tenant["id"], "i": invoice["id"]})
+    assert data["missing"] == "Error: Invoice or Transaction not found"
+    assert data["again"] == "Error: Invoice or Transaction not found"
+    # One batched SELECT per loader, not one per field.
+    selects = [s for s in statements if s.lstrip().upper().startswith("SELECT")]
+    assert len(selects) == 2
+
+@pytest.mark.asyncio
+async def test_graphql_delete_invoice_twice_in_one_operation(client: AsyncClient):
+    tenant = (await gql(client, CREATE_TENANT, {"name": "Delete Tenant"}))["createTenant"]
+    invoice = (await gql(client, CREATE_INVOICE, {"tenantId": tenant["id"], "amount": 10.0}))["createInvoice"]
+
+    mutation = """
+    mutation($t: String!, $i: String!) {
+        a: deleteInvoice(tenantId: $t, invoiceId: $i)
+        b: deleteInvoice(tenantId: $t, invoiceId: $i)
+    }
+    """
+    data = await gql(client, mutation, {"t": tenant["id"], "i": invoice["id"]})
+    assert data == {"a": True, "b": False}
+
+@pytest.mark.asyncio
+async def test_graphql_invoices_keyset_pagination(client: AsyncClient):
+    tenant = (await gql(client, CREATE_TENANT, {"name": "Paging Tenant"}))["createTenant"]
+    created = set()
+    for amount in range(1, 6):
+        invoice = (await gql(client, CREATE_INVOICE, {"tenantId": tenant["id"], "amount": float(amount)}))["createInvoice"]
+        created.add(invoice["id"])
+
+    query = "query($t: String!, $after: String) { invoices(tenantId: $t, limit: 2, after: $after) { id cursor } }"
+    seen = []
+    after = None
+    while True:
+        page = (await gql(client, query, {"t": tenant["id"], "after": after}))["invoices"]
+        if not page:
+            break
+        seen.extend(i["id"] for i in page)
+        after = page[-1]["cursor"]
+        if len(seen) == 2:
+            # The cursor doesn't depend on the anchor row still existing.
+            delete = "mutation($t: String!, $i: String!) { deleteInvoice(tenantId: $t, invoiceId: $i) }"
+            assert (await gql(client, delete, {"t": tenant["id"], "i": seen[-1]}))["deleteInvoice"]
+
+    assert len(seen) == 5
+    assert set(seen) == created
+
+    resp = await client.post("/graphql", json={"query": query, "variables": {"t": tenant["id"], "after": "!!"}})
+    assert resp.json()["errors"][0]["message"] == "Invalid cursor"
+
+@pytest.mark.asyncio
+async def test_graphql_cursor_matches_rest(client: AsyncClient):
+    tenant = (await gql(client, CREATE_TENANT, {"name": "Cursor Tenant"}))["createTenant"]
+    for amount in range(1, 4):
+        await client.post(f"/api/v1/tenants/{tenant['id']}/invoices", json={"amount": amount, "currency": "USD"})
+    rest = (await client.get(f"/api/v1/tenants/{tenant['id']}/invoices", params={"limit": 1})).json()
+    query = "query($t: String!) { invoices(tenantId: $t, limit: 1) { cursor } }"
+    assert (await gql(client, query, {"t": tenant["id"]}))["invoices"][0]["cursor"] == rest["next_cursor"]
+
+    txs = "query($t: String!, $after: String) { bankTransactions(tenantId: $t, after: $after) { id } }"
+    assert (await gql(client, txs, {"t": tenant["id"], "after": rest["next_cursor"]}))["bankTransactions"] == []
+
+@pytest.mark.asyncio
+async def test_graphql_reconcile_and_list_matches(client: AsyncClient):
+    tenant = (await gql(client, CREATE_TENANT, {"name": "Match Tenant"}))["createTenant"]
+    await gql(client, CREATE_INVOICE, {"tenantId": tenant["id"], "amount": 75.0})
+
+    import_tx = """
+    mutation($t: String!) {
+        importBankTransactions(tenantId: $t, idempotencyKey: "gql-import", input: {transactions: [
+            {amount: 75.0, postedAt: "2023-01-02T00:00:00", description: "Payment"}
+        ]}) { count transactionIds }
+    }
+    """
+    imported = (await gql(client, import_tx, {"t": tenant["id"]}))["importBankTransactions"]
+    assert imported["count"] == 1
+
+    txs = await gql(client, "query($t: String!) { bankTransactions(tenantId: $t) { id amount postedAt createdAt } }", {"t": tenant["id"]})
+    assert [t["id"] for t in txs["bankTransactions"]] == imported["transactionIds"]
+    assert txs["bankTransactions"][0]["postedAt"].startswith("2023-01-02T00:00:00")
+
+    reconcile = "mutation($t: String!) { reconcile(tenantId: $t) { id status score createdAt } }"
+    candidates = (await gql(client, reconcile, {"t": tenant["id"]}))["reconcile"]
+    assert len(candidates) == 1
+    assert candidates[0]["status"] == "proposed"
+
+    matches = await gql(client, "query($t: String!) { matchCandidates(tenantId: $t) { id status createdAt } }", {"t": tenant["id"]})
+    assert [m["id"] for m in matches["matchCandidates"]] == [candidates[0]["id"]]
+    assert matches["matchCandidates"][0]["status"] == "proposed"
+    assert matches["matchCandidates"][0]["createdAt"] == candidates[0]["createdAt"]
+
+    confirm = "mutation($t: String!, $m: String!) { confirmMatch(tenantId: $t, matchId: $m) { id status createdAt } }"
+    confirmed = (await gql(client, confirm, {"t": tenant["id"], "m": candidates[0]["id"]}))["confirmMatch"]
+    assert confirmed["status"] == "confirmed"
+    assert confirmed["createdAt"] == candidates[0]["createdAt"]
+
+    matches = await gql(client, "query($t: String!) { matchCandidates(tenantId: $t, status: \"confirmed\") { id status } }", {"t": tenant["id"]})
+    assert matches["matchCandidates"] == [{"id": candidates[0]["id"], "status": "confirmed"}]
+
+@pytest.mark.asyncio
+async def test_graphql_mutation_timestamps_match_list_query(client: AsyncClient):
+    tenant = (await gql(client, CREATE_TENANT, {"name": "Timestamp Tenant"}))["createTenant"]
+    create = """
+    mutation($t: String!, $d: String!) {
+        createInvoice(tenantId: $t, input: {amount: 5.0, invoiceDate: $d}) { id invoiceDate createdAt cursor }
+    }
+    """
+    expected = {
+        "2023-01-01T10:20:30.456789": "2023-01-01T10:20:30.457",
+        # SQLite clamps at .999 rather than rolling into the next minute.
+        "2023-01-01T15:41:59.999654": "2023-01-01T15:41:59.999",
+    }
+    created = []
+    for sent, formatted in expected.items():
+        invoice = (await gql(client, create, {"t": tenant["id"], "d": sent}))["createInvoice"]
+        assert invoice["invoiceDate"] == formatted
+        assert invoice["createdAt"].endswith("Z")
+        created.append(invoice)
+
+    listed = await gql(client, "query($t: String!) { invoices(tenantId: $t) { id invoiceDate createdAt cursor } }", {"t": tenant["id"]})
+    key = lambda i: i["id"]
+    assert sorted(listed["invoices"], key=key) == sorted(created, key=key)
+
+@pytest.mark.asyncio
+async def test_graphql_selects_requested_fields_only(client: AsyncClient):
+    tenant = (await gql(client, CREATE_TENANT, {"name": "Projection Tenant"}))["createTenant"]
+    await gql(client, CREATE_INVOICE, {"tenantId": tenant["id"], "amount": 12.5})
+
+    query = """
+    query($t: String!) {
+        invoices(tenantId: $t) { amount ...Dates __typename }
+    }
+    fragment Dates on InvoiceType { invoiceDate createdAt }
+    """
+    invoice = (await gql(client, query, {"t": tenant["id"]}))["invoices"][0]
+    assert set(invoice) == {"amount", "invoiceDate", "createdAt", "__typename"}
+    assert invoice["amount"] == 12.5
+    assert invoice["invoiceDate"].startswith("2023-01-01T00:00:00")
+
+    tenants = (await gql(client, "{ tenants { __typename } }"))["tenants"]
+    assert len(tenants) == 1
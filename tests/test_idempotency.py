@@ -62,3 +62,45 @@ async def test_import_conflict_different_payload(db_session):
     
     assert exc_info.value.status_code == 409
     assert "different payload" in exc_info.value.detail.lower()
+
+@pytest.mark.asyncio
+async def test_import_bulk_rows(db_session):
+    service = ImportService(db_session)
+    tenant_id = str(uuid.uuid4())
+
+    tx_data = [{
+        "amount": 10.0 * i,
+        "currency": "USD",
+        "posted_at": f"2023-03-0{i}T00:00:00",
+        "description": f"Charge {i}",
+        "external_id": f"bulk-{i}"
+    } for i in range(1, 4)]
+
+    result = await service.import_transactions(tenant_id, tx_data, "bulk-key")
+    assert result["count"] == 3
+    assert len(set(result["transaction_ids"])) == 3
+
+    stmt = select(BankTransaction).where(BankTransaction.tenant_id == tenant_id)
+    stored = {t.id: t for t in (await db_session.execute(stmt)).scalars().all()}
+    assert set(stored) == set(result["transaction_ids"])
+    assert stored[result["transaction_ids"][1]].external_id == "bulk-2"
+
+@pytest.mark.asyncio
+async def test_failed_import_releases_key(db_session):
+    service = ImportService(db_session)
+    tenant_id = str(uuid.uuid4())
+    key = "retry-key-789"
+
+    bad_data = [{
+        "amount": 10.0,
+        "currency": "USD",
+        "posted_at": "not-a-date",
+        "description": "Broken",
+        "external_id": "ext-bad"
+    }]
+    with pytest.raises(ValueError):
+        await service.import_transactions(tenant_id, bad_data, key)
+
+    good_data = [dict(bad_data[0], posted_at="2023-01-01T00:00:00")]
+    result = await service.import_transactions(tenant_id, good_data, key)
+    assert result["count"] == 1
@@ -1,10 +1,14 @@
 import pytest
-from datetime import datetime
+import numpy as np
+from difflib import SequenceMatcher
+from datetime import datetime, timedelta, timezone
 from unittest.mock import patch, AsyncMock, MagicMock
+import uuid
 import httpx
-from app.services.reconciliation import ReconciliationService
+from sqlalchemy import select
+from app.services.reconciliation import ReconciliationService, bump_tenant_revision, _component_scores, _epoch_microseconds, _fast_ratio, _may_clear_threshold, _similarities, _similarity
 from app.services.ai_service import AIService
-from app.models import Invoice, BankTransaction, MatchStatus, Tenant
+from app.models import Invoice, BankTransaction, MatchCandidate, MatchStatus, Tenant
 
 @pytest.mark.asyncio
 async def test_reconciliation_heuristics(db_session):
@@ -59,6 +63,137 @@ async def test_reconciliation_ranking(db_session):
     assert inv2_match is not None
     assert inv1_match.score > inv2_match.score
 
+@pytest.mark.asyncio
+async def test_reconciliation_matches_on_date_and_description_without_amount(db_session):
+    tenant = Tenant(name="Blocking Tenant")
+    db_session.add(tenant)
+    await db_session.commit()
+    tenant_id = tenant.id
+
+    now = datetime(2024, 3, 10, 12, 0)
+    inv = Invoice(tenant_id=tenant_id, amount=100.0, currency="USD", invoice_date=now, status="open", description="Consulting")
+    near = BankTransaction(tenant_id=tenant_id, amount=250.0, currency="USD", posted_at=now + timedelta(days=2), description="consulting", external_id="near")
+    far = BankTransaction(tenant_id=tenant_id, amount=250.0, currency="USD", posted_at=now + timedelta(days=10), description="Consulting", external_id="far")
+    cents = BankTransaction(tenant_id=tenant_id, amount=100.004, currency="USD", posted_at=now + timedelta(days=30), description="Wire", external_id="cents")
+    other_currency = BankTransaction(tenant_id=tenant_id, amount=100.0, currency="EUR", posted_at=now + timedelta(days=30), description="Wire", external_id="eur")
+
+    db_session.add_all([inv, near, far, cents, other_currency])
+    await db_session.commit()
+
+    candidates = await ReconciliationService(db_session).reconcile(tenant_id)
+
+    scores = {c.transaction_id: c.score for c in candidates}
+    assert set(scores) == {cents.id, near.id}
+    assert scores[cents.id] >= 0.6
+    assert scores[near.id] == 0.4
+
+@pytest.mark.asyncio
+async def test_reconciliation_date_window_uses_elapsed_days(db_session):
+    tenant = Tenant(name="Date Tenant")
+    db_session.add(tenant)
+    await db_session.commit()
+    tenant_id = tenant.id
+
+    # Three calendar days apart but more than three full days elapsed, so only
+    # the 7-day bonus applies and identical descriptions top out at 0.3.
+    inv = Invoice(tenant_id=tenant_id, amount=10.0, currency="USD", invoice_date=datetime(2024, 1, 5, 1), status="open", description="Hosting")
+    late = BankTransaction(tenant_id=tenant_id, amount=99.0, currency="USD", posted_at=datetime(2024, 1, 8, 2), description="hosting", external_id="late")
+    on_time = BankTransaction(tenant_id=tenant_id, amount=99.0, currency="USD", posted_at=datetime(2024, 1, 8, 0), description="hosting", external_id="on-time")
+
+    db_session.add_all([inv, late, on_time])
+    await db_session.commit()
+
+    candidates = await ReconciliationService(db_session).reconcile(tenant_id)
+
+    assert [(c.transaction_id, c.score) for c in candidates] == [(on_time.id, 0.4)]
+
+@pytest.mark.asyncio
+async def test_repeat_reconcile_reuses_unchanged_result(db_session):
+    tenant = Tenant(name="Repeat Tenant")
+    db_session.add(tenant)
+    await db_session.commit()
+    tenant_id = tenant.id
+
+    now = datetime(2024, 6, 1)
+    db_session.add_all([
+        Invoice(tenant_id=tenant_id, amount=20.0, currency="USD", invoice_date=now, status="open"),
+        BankTransaction(tenant_id=tenant_id, amount=20.0, currency="USD", posted_at=now, description="x", external_id="r1"),
+    ])
+    await db_session.commit()
+
+    service = ReconciliationService(db_session)
+    first = await service.reconcile(tenant_id)
+    first[0].status = MatchStatus.CONFIRMED
+    await db_session.commit()
+
+    second = await service.reconcile(tenant_id)
+    assert [c.id for c in second] == [c.id for c in first]
+    assert second[0].status == MatchStatus.CONFIRMED
+    assert len((await db_session.scalars(select(MatchCandidate))).all()) == 1
+
+    db_session.add(BankTransaction(tenant_id=tenant_id, amount=20.0, currency="USD", posted_at=now, description="y", external_id="r2"))
+    await bump_tenant_revision(db_session, tenant_id)
+    await db_session.commit()
+
+    third = await service.reconcile(tenant_id)
+    assert len(third) == 2
+    assert first[0].id not in {c.id for c in third}
+
+@pytest.mark.asyncio
+async def test_reconcile_cache_invalidated_by_writes_not_max_id(client, db_session):
+    tenant_id = (await client.post("/api/v1/tenants", json={"name": "Legacy Tenant"})).json()["id"]
+    # A pre-ULID uuid4 id sorts above every ULID, so max(id) never moves.
+    db_session.add(Invoice(id=str(uuid.uuid4()), tenant_id=tenant_id, amount=999.0, currency="USD", status="open"))
+    db_session.add(BankTransaction(tenant_id=tenant_id, amount=50.0, currency="USD", posted_at=datetime(2024, 6, 1), description="x"))
+    await db_session.commit()
+    url = f"/api/v1/tenants/{tenant_id}"
+    eur = (await client.post(f"{url}/invoices", json={"amount": 50.0, "currency": "EUR"})).json()["id"]
+    assert (await client.post(f"{url}/reconcile")).json() == []
+
+    await client.delete(f"{url}/invoices/{eur}")
+    await client.post(f"{url}/invoices", json={"amount": 50.0, "currency": "USD"})
+    assert len((await client.post(f"{url}/reconcile")).json()) == 1
+
+def test_epoch_microseconds_normalises_aware_datetimes():
+    naive = datetime(2024, 1, 5, 1, 30)
+    aware = datetime(2024, 1, 5, 3, 30, tzinfo=timezone(timedelta(hours=2)))
+    assert _epoch_microseconds(naive) == _epoch_microseconds(aware)
+    assert _epoch_microseconds(datetime(1970, 1, 2)) == 86_400_000_000
+
+def test_component_scores_kernel():
+    day = 86_400_000_000
+    scores = _component_scores(
+        invoice_amounts=np.array([100.0, 100.0, 100.0, 100.0]),
+        invoice_currencies=np.array([0, 0, 0, 0], dtype=np.int16),
+        invoice_dates=np.array([0, 0, 0, 0], dtype=np.int64),
+        has_date=np.array([True, True, True, False]),
+        tx_amounts=np.array([100.005, 100.0, 50.0, 100.0]),
+        tx_currencies=np.array([0, 1, 0, 0], dtype=np.int16),
+        tx_dates=np.array([3 * day, 3 * day + 1, -7 * day, 0], dtype=np.int64)
+    )
+    assert scores.tolist() == [0.6 + 0.2, 0.1, 0.1, 0.6]
+
+@pytest.mark.parametrize("a, b", [
+    ("consulting", "consulting payment"),
+    ("", "wire"),
+    ("acme ref 123", "acme ref 123"),
+    ("ab " * 150, "ba a" * 100),
+])
+def test_similarity_matches_sequence_matcher(a, b):
+    assert _similarity(a, b) == SequenceMatcher(None, a, b).ratio()
+
+def test_batched_similarities_keep_pair_order():
+    pairs = [("consulting", "consulting payment"), ("ab " * 150, "ba a" * 100), ("fee", "fee"), ("fee", "wire fee")]
+    assert _similarities(pairs) == [SequenceMatcher(None, a, b).ratio() for a, b in pairs]
+    assert _similarities(pairs[::2]) == [SequenceMatcher(None, a, b).ratio() for a, b in pairs[::2]]
+
+@pytest.mark.parametrize("fast", [True, False])
+def test_similarity_bounds_prune_hopeless_pairs(fast):
+    with patch("app.services.reconciliation._fast_ratio", _fast_ratio if fast else None):
+        assert not _may_clear_threshold(0.2, "x", "consulting payment")
+        assert _may_clear_threshold(0.2, "consulting", "consulting payment")
+        assert _may_clear_threshold(0.2, "abcd", "wxyz") is fast
+
 @pytest.mark.asyncio
 async def test_ai_fallback_on_error():
     service = AIService()
@@ -77,7 +212,7 @@ async def test_ai_fallback_on_error():
 async def test_ai_success_path():
     service = AIService()
     inv = Invoice(amount=100.0, currency="USD", invoice_date=datetime.now(), description="Consulting")
-    tx = BankTransaction(amount=100.0, currency="USD", posted_at=datetime.now(), description="Consulting Inv", external_id="1")
+    tx = BankTransaction(amount=100.0, currency="USD", posted_at=datetime.now(), description="Consulting INV 2023/01", external_id="1")
     
     mock_response = MagicMock()
     mock_response.status_code = 200
@@ -88,3 +223,30 @@ async def test_ai_success_path():
         explanation = await service.explain_match(inv, tx)
     
     assert "strong match" in explanation.lower() or "100" in explanation
+    requested_url = mock_get.call_args.args[0]
+    assert " " not in requested_url
+    prompt_path = requested_url[len(service.base_url):]
+    assert "/" not in prompt_path
+    assert "2023%2F01" in prompt_path
+
+@pytest.mark.asyncio
+async def test_ai_explanation_is_cached():
+    service = AIService()
+    inv = Invoice(id="inv-cache", amount=42.0, currency="USD", invoice_date=datetime.now(), description="Cached")
+    tx = BankTransaction(id="tx-cache", amount=42.0, currency="USD", posted_at=datetime.now(), description="Cached Inv", external_id="1")
+
+    mock_response = MagicMock()
+    mock_response.status_code = 200
+    mock_response.text = "Amounts match."
+
+    with patch.object(httpx.AsyncClient, 'get', new_callable=AsyncMock) as mock_get:
+        mock_get.return_value = mock_response
+        first = await service.explain_match(inv, tx)
+        second = await service.explain_match(inv, tx)
+        assert mock_get.await_count == 1
+
+        tx.amount = 43.0
+        await service.explain_match(inv, tx)
+        assert mock_get.await_count == 2
+
+    assert first == second == "Amounts match."